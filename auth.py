@@ -1,7 +1,6 @@
 import requests
 import time
-import webbrowser
-import pyperclip
+import profiler
 
 # Azure应用程序的客户端ID
 client_id = 'de243363-2e6a-44dc-82cb-ea8d6b5cd98d'
@@ -18,10 +17,15 @@ async def authenticate():
     }
 
     try:
-        device_code_response = requests.post(device_code_url, data=device_code_data, headers=device_code_headers)
+        with profiler.phase('auth'):
+            device_code_response = requests.post(device_code_url, data=device_code_data, headers=device_code_headers)
         device_code_response.raise_for_status()
         device_code_info = device_code_response.json()
 
+        # 仅在设备代码登录时需要，刷新令牌时不必导入
+        import webbrowser
+        import pyperclip
+
         # 打开授权网址
         webbrowser.open(device_code_info['verification_uri'])
 
@@ -67,6 +71,8 @@ async def authenticate():
             print(f"Other error occurred: {err}")
             exit(1)
 
+    # 以下均为无需用户参与的网络请求，只统计这部分耗时，不含等待用户授权的时间
+    exchange_start = time.perf_counter()
     access_token = token_info['access_token']
     refresh_token = token_info['refresh_token']
 
@@ -148,6 +154,7 @@ async def authenticate():
     profile_response = requests.get(profile_url, headers=profile_headers)
     profile_response.raise_for_status()
     profile_info = profile_response.json()
+    profiler.record('auth', time.perf_counter() - exchange_start)
 
     return {
         'username': profile_info['name'],
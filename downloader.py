@@ -6,7 +6,6 @@ import time
 import hashlib
 import logging
 import platform
-import zipfile
 
 async def calculate_file_hash(path, hash_algorithm='sha1'):
     hash_func = hashlib.new(hash_algorithm)
@@ -132,6 +131,7 @@ async def download_libraries(version_data, os_name):
     return natives_paths
 
 def extract_natives(natives_paths, version, arch):
+    import zipfile
     natives_dir = f'.minecraft/versions/{version}/{version}-natives'
     os.makedirs(natives_dir, exist_ok=True)
     
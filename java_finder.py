@@ -1,6 +1,8 @@
 import os
 import subprocess
 import re
+import time
+import profiler
 
 def find_java_version(target_version):
     java_exe_path = ""
@@ -10,6 +12,8 @@ def find_java_version(target_version):
     # 定义版本号匹配的正则表达式
     version_pattern = re.compile(r'version\s+"(\d+\.\d+)(?:\.\d+)?')
 
+    # 只统计探测耗时，不含下方等待用户输入路径的时间
+    probe_start = time.perf_counter()
     # 遍历每个目录
     for dir in path_dirs:
         java_path = os.path.join(dir, 'java.exe')
@@ -31,6 +35,7 @@ def find_java_version(target_version):
                         break
             except Exception as e:
                 print(f"检查{java_path}时出现错误: {e}")
+    profiler.record('java', time.perf_counter() - probe_start)
     
     if java_exe_path:
         print(f"在{java_exe_path}找到Java {target_version}")
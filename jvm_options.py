@@ -0,0 +1,121 @@
+import os
+import sys
+import hashlib
+import logging
+import uuid
+
+# 为操作系统和启动器本身保留的内存（MB）
+MIN_RESERVED_MEMORY = 2048
+# 单个客户端堆内存的上下限（MB），原版客户端在1G以下很容易频繁GC
+MIN_HEAP_SIZE = 1024
+MAX_HEAP_SIZE = 4096
+# -XX:ArchiveClassesAtExit（动态AppCDS归档）从JDK 13开始支持
+MIN_CDS_JAVA_VERSION = 13
+
+def get_total_memory():
+    """返回本机物理内存大小（MB），获取失败时返回None"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [
+                    ('dwLength', ctypes.c_ulong),
+                    ('dwMemoryLoad', ctypes.c_ulong),
+                    ('ullTotalPhys', ctypes.c_ulonglong),
+                    ('ullAvailPhys', ctypes.c_ulonglong),
+                    ('ullTotalPageFile', ctypes.c_ulonglong),
+                    ('ullAvailPageFile', ctypes.c_ulonglong),
+                    ('ullTotalVirtual', ctypes.c_ulonglong),
+                    ('ullAvailVirtual', ctypes.c_ulonglong),
+                    ('ullAvailExtendedVirtual', ctypes.c_ulonglong),
+                ]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return status.ullTotalPhys // 1024 // 1024
+        else:
+            return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 1024 // 1024
+    except (AttributeError, OSError, ValueError) as e:
+        logging.debug(f"Failed to read total memory: {e}")
+    return None
+
+def get_available_heap_memory():
+    """返回可分配给所有游戏实例的堆内存总量（MB），无法获取本机内存时返回None"""
+    total_memory = get_total_memory()
+    if not total_memory:
+        return None
+    return max(total_memory - max(MIN_RESERVED_MEMORY, total_memory // 4), 0)
+
+def get_max_instance_count():
+    """返回每个实例都能分到MIN_HEAP_SIZE时最多可同时运行的实例数，无法获取本机内存时返回None"""
+    available = get_available_heap_memory()
+    if available is None:
+        return None
+    return available // MIN_HEAP_SIZE
+
+def compute_heap_size(instance_count=1):
+    """根据本机内存和同时运行的实例数计算(-Xms, -Xmx)，单位MB"""
+    available = get_available_heap_memory()
+    if available is None:
+        return MIN_HEAP_SIZE, MIN_HEAP_SIZE * 2
+    per_instance = available // max(instance_count, 1)
+    if per_instance < MIN_HEAP_SIZE:
+        # 仍按下限分配，否则客户端基本无法运行，但所有实例的堆加起来会超过物理内存
+        logging.warning(f"Only {per_instance}MB of heap per instance for {instance_count} instances, "
+                        f"using {MIN_HEAP_SIZE}MB; total heap will exceed physical memory")
+    xmx = max(MIN_HEAP_SIZE, min(MAX_HEAP_SIZE, per_instance))
+    # 按256MB对齐，便于阅读
+    xmx = xmx // 256 * 256
+    xms = max(512, xmx // 2)
+    return xms, xmx
+
+def get_heap_args(instance_count=1):
+    xms, xmx = compute_heap_size(instance_count)
+    return [f"-Xms{xms}M", f"-Xmx{xmx}M"]
+
+def get_jdk_identity(java_path):
+    """返回标识JDK构建的字符串，原地升级JDK（路径不变）时也会变化"""
+    identity = java_path
+    try:
+        identity += f"|{os.path.getmtime(java_path)}|{os.path.getsize(java_path)}"
+        # JDK根目录下的release文件记录了完整版本号
+        release_path = os.path.join(os.path.dirname(os.path.dirname(java_path)), 'release')
+        if os.path.isfile(release_path):
+            with open(release_path, 'r', encoding='utf-8', errors='ignore') as f:
+                identity += f"|{f.read()}"
+    except OSError as e:
+        logging.debug(f"Failed to read JDK identity of {java_path}: {e}")
+    return identity
+
+def get_cds_archive_path(game_dir, version, java_path, classpath):
+    # 归档只对生成它的JDK和classpath有效，任一变化都换一个新文件
+    # -Xshare:auto下JVM会静默拒绝不匹配的归档，因此键中必须包含JDK本身的标识而不只是路径
+    key = hashlib.sha1(f"{get_jdk_identity(java_path)}|{classpath}".encode('utf-8')).hexdigest()[:8]
+    return os.path.join(game_dir, 'versions', version, f'{version}-{key}.jsa')
+
+def get_cds_args(game_dir, version, java_version, java_path, classpath):
+    """返回(AppCDS参数, 待生成的归档临时路径)，已有归档时临时路径为None"""
+    if int(java_version) < MIN_CDS_JAVA_VERSION:
+        return [], None
+    archive_path = get_cds_archive_path(game_dir, version, java_path, classpath)
+    if os.path.isfile(archive_path) and os.path.getsize(archive_path) > 0:
+        return [f"-XX:SharedArchiveFile={archive_path}", "-Xshare:auto"], None
+    # 首次启动时在退出时生成归档，多个实例同时首次启动时各自写入不同的临时文件
+    dump_path = f"{archive_path}.{uuid.uuid4().hex}.tmp"
+    return [f"-XX:ArchiveClassesAtExit={dump_path}"], dump_path
+
+def finalize_cds_archive(dump_path):
+    """游戏进程退出后调用，将生成的临时归档替换为正式归档"""
+    if not dump_path:
+        return
+    archive_path = dump_path.rsplit('.', 2)[0]
+    try:
+        if os.path.isfile(dump_path) and os.path.getsize(dump_path) > 0:
+            os.replace(dump_path, archive_path)
+            logging.info(f"Created AppCDS archive {archive_path}")
+        elif os.path.exists(dump_path):
+            os.remove(dump_path)
+    except OSError as e:
+        logging.warning(f"Failed to finalize AppCDS archive {dump_path}: {e}")
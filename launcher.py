@@ -3,9 +3,9 @@ import json
 import uuid as uuid_lib
 import subprocess
 import re
-import aiohttp
-import auth
+import profiler
 from java_finder import find_java_version
+from jvm_options import get_heap_args, get_cds_args, finalize_cds_archive
 
 def format_log4j_event(line, printed_logs):
     match = re.search(r'<log4j:Message><!\[CDATA\[(.*?)\]\]></log4j:Message>\s', line, re.DOTALL)
@@ -37,16 +37,48 @@ def replace_and_clean_args(args, replacements):
     args = re.sub(r'\$\{[^\}]+\}', '', args)
     return args
 
-async def generate_and_run_bat(game_dir, version, auth_player_name, uuid, access_token):
+def write_default_options(game_directory):
+    options_path = os.path.join(game_directory, 'options.txt')
+    if not os.path.exists(options_path):
+        options = {
+            "lang": "zh_CN",
+            "gamma": "1.0",
+            "maxFps": "260",
+            "narrator": 0
+        }
+        os.makedirs(game_directory, exist_ok=True)
+        with open(options_path, "w", encoding="utf-8") as options_file:
+            for key, value in options.items():
+                options_file.write(f"{key}:{value}\n")
+
+async def load_version_json(game_dir, version):
+    # 优先读取下载时保存的版本json文件，不存在时才联网获取
+    version_json_path = os.path.join(game_dir, 'versions', version, f'{version}.json')
+    if os.path.isfile(version_json_path):
+        with open(version_json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    import aiohttp
     async with aiohttp.ClientSession() as session:
-        # 获取版本json文件
         version_manifest_url = "https://piston-meta.mojang.com/mc/game/version_manifest.json"
         version_manifest = await fetch_json(session, version_manifest_url)
         version_url = next(v['url'] for v in version_manifest['versions'] if v['id'] == version)
-        version_json = await fetch_json(session, version_url)
+        return await fetch_json(session, version_url)
+
+def get_java_major_version(version_json):
+    return str(version_json["javaVersion"]["majorVersion"])
 
+async def build_launch_command(game_dir, version, auth_player_name, uuid, access_token, instance_dir=None, instance_count=1, java_path=None):
+    # instance_dir为独立的游戏目录（存档、配置、日志），版本、库和资源仍从game_dir读取
+    # instance_count为同时运行的实例数，用于计算堆内存大小
+    # java_path为已解析好的Java路径，传入时不再探测或询问用户
+    # 返回(命令, AppCDS临时归档路径)，进程退出后需将后者交给finalize_cds_archive
+    game_directory = instance_dir or game_dir
+    with profiler.phase('metadata'):
+        version_json = await load_version_json(game_dir, version)
+
+    with profiler.phase('arguments'):
         log4j_path = f"{game_dir}\\logs\\{version_json.get('logging', {}).get('client', {}).get('file', {}).get('id')}"
-        
+
         version_folder = os.path.join(game_dir, 'versions', version)
 
         version_name = version
@@ -59,7 +91,7 @@ async def generate_and_run_bat(game_dir, version, auth_player_name, uuid, access
         natives_directory = os.path.join(game_dir, 'versions', version, f'{version}-natives')
         launcher_name = "FastCraftLauncher"
         launcher_version = "1.0"
-        
+
         libraries = [os.path.join(game_dir, 'libraries', lib['downloads']['artifact']['path']) for lib in version_json['libraries'] if 'downloads' in lib and 'artifact' in lib['downloads']]
         libraries.append(f"{os.path.join(game_dir, 'versions', version, f'{version}.jar')}")
         classpath = ";".join(libraries)
@@ -80,7 +112,7 @@ async def generate_and_run_bat(game_dir, version, auth_player_name, uuid, access
         replacements = {
             "${auth_player_name}": auth_player_name,
             "${version_name}": version_name,
-            "${game_directory}": game_dir,
+            "${game_directory}": game_directory,
             "${assets_root}": assets_root,
             "${assets_index_name}": assets_index_name,
             "${auth_uuid}": uuid,
@@ -95,60 +127,59 @@ async def generate_and_run_bat(game_dir, version, auth_player_name, uuid, access
             "${version_type}": version_type
         }
 
-        game_args = replace_and_clean_args(game_args, replacements)
-        java_args = replace_and_clean_args(java_args, replacements)
+        # 先按空格拆分再替换变量，避免路径中的空格把参数拆开
+        game_args = [replace_and_clean_args(arg, replacements) for arg in game_args.split()]
+        java_args = [replace_and_clean_args(arg, replacements) for arg in java_args.split()]
 
-        java_version = str(version_json["javaVersion"]["majorVersion"])
+    java_version = get_java_major_version(version_json)
+    if java_path is None:
         java_path = find_java_version(java_version)
         print(f"Java路径: {java_path}")
-        command = java_path + java_args + " net.minecraft.client.main.Main " + game_args
-
-        bat_file_path = "launch_minecraft.bat"
-        with open(bat_file_path, "w", encoding="utf-8") as bat_file:
-            bat_file.write("@echo off\n")
-            bat_file.write("echo Running Minecraft...\n")
-            bat_file.write("echo Command: " + command + "\n")
-            bat_file.write(command + "\n")
-            bat_file.write("pause\n")
-
-        options_path = os.path.join(game_dir, 'options.txt')
-        if not os.path.exists(options_path):
-            options = {
-                "lang": "zh_CN",
-                "gamma": "1.0",
-                "maxFps": "260",
-                "narrator": 0
-            }
-            with open(options_path, "w", encoding="utf-8") as options_file:
-                for key, value in options.items():
-                    options_file.write(f"{key}:{value}\n")
-        print(f"Batch file created: {bat_file_path}")
-
-        printed_logs = set()
-        with subprocess.Popen([bat_file_path], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="latin-1") as proc:
-            if proc.stdout:
-                print("Minecraft启动中...")
-                for line in proc.stdout:
-                    line = line.replace('\r\n', '\n').replace('\r', '\n')
-                    formatted_line = format_log4j_event(line, printed_logs)
-                    if formatted_line:
-                        print(formatted_line, end='')
-
-            stdout, stderr = proc.communicate()
-            print("游戏进程已结束")
-            if stdout:
-                for line in stdout.splitlines():
-                    line = line.replace('\r\n', '\n').replace('\r', '\n')
-                    formatted_line = format_log4j_event(line, printed_logs)
-                    if formatted_line:
-                        print(formatted_line, end='')
+    with profiler.phase('arguments'):
+        cds_args, cds_dump_path = get_cds_args(game_dir, version, java_version, java_path, classpath)
+        jvm_args = get_heap_args(instance_count) + cds_args + [arg for arg in java_args if arg]
+        command = [java_path] + jvm_args + ["net.minecraft.client.main.Main"] + [arg for arg in game_args if arg]
 
-async def launch_game():
-    # 先探测是否有versions
-    if not os.path.exists('.minecraft/versions'):
-        print("没有找到Minecraft版本，请先下载")
-        return
-    
+        write_default_options(game_directory)
+    return command, cds_dump_path
+
+async def generate_and_run_bat(game_dir, version, auth_player_name, uuid, access_token):
+    command, cds_dump_path = await build_launch_command(game_dir, version, auth_player_name, uuid, access_token)
+    command = subprocess.list2cmdline(command)
+
+    bat_file_path = "launch_minecraft.bat"
+    with open(bat_file_path, "w", encoding="utf-8") as bat_file:
+        bat_file.write("@echo off\n")
+        bat_file.write("echo Running Minecraft...\n")
+        bat_file.write("echo Command: " + command + "\n")
+        bat_file.write(command + "\n")
+        bat_file.write("pause\n")
+    print(f"Batch file created: {bat_file_path}")
+
+    printed_logs = set()
+    with profiler.phase('spawn'):
+        proc = subprocess.Popen([bat_file_path], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="latin-1")
+    profiler.report()
+    with proc:
+        if proc.stdout:
+            print("Minecraft启动中...")
+            for line in proc.stdout:
+                line = line.replace('\r\n', '\n').replace('\r', '\n')
+                formatted_line = format_log4j_event(line, printed_logs)
+                if formatted_line:
+                    print(formatted_line, end='')
+
+        stdout, stderr = proc.communicate()
+        print("游戏进程已结束")
+        if stdout:
+            for line in stdout.splitlines():
+                line = line.replace('\r\n', '\n').replace('\r', '\n')
+                formatted_line = format_log4j_event(line, printed_logs)
+                if formatted_line:
+                    print(formatted_line, end='')
+    finalize_cds_archive(cds_dump_path)
+
+async def select_account():
     mode = input("请选择启动模式（1：离线启动，2：使用正版账户）：")
     if mode == '1':
         username = input("请输入用户名：")
@@ -157,6 +188,9 @@ async def launch_game():
         access_token = str(uuid_lib.uuid3(uuid_lib.NAMESPACE_DNS, username))
         print("UUID:", uuid)
     elif mode == '2':
+        # 只有正版账户需要requests等联网依赖
+        with profiler.phase('import auth'):
+            import auth
         accounts = {}
         if os.path.exists('refresh_token.json'):
             with open('refresh_token.json', 'r') as f:
@@ -177,7 +211,8 @@ async def launch_game():
             else:
                 selected_account = list(accounts.keys())[choice - 1]
                 refresh_token = accounts[selected_account]
-                access_token, new_refresh_token = await auth.refresh_access_token(refresh_token)
+                with profiler.phase('auth'):
+                    access_token, new_refresh_token = await auth.refresh_access_token(refresh_token)
                 if access_token:
                     print(f"使用refresh token获取新的access token成功，账户：{selected_account}")
                     accounts[selected_account] = new_refresh_token
@@ -207,7 +242,20 @@ async def launch_game():
         access_token = auth_info['access_token']
     else:
         print("无效的选择")
+        return None
+
+    return username, uuid, access_token
+
+async def launch_game():
+    # 先探测是否有versions
+    if not os.path.exists('.minecraft/versions'):
+        print("没有找到Minecraft版本，请先下载")
+        return
+
+    account = await select_account()
+    if account is None:
         return
+    username, uuid, access_token = account
 
     # gamedir为当前目录下的.minecraft文件夹
     game_dir = os.path.join(os.getcwd(), '.minecraft')
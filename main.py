@@ -1,8 +1,17 @@
+import time
+_import_start = time.perf_counter()
 import asyncio
 import logging
 import os
-import downloader
-import launcher
+import sys
+import profiler
+# 下载、启动和多实例模块依赖aiohttp等较重的库，只在对应操作中按需导入
+
+# --profile-startup 报告各启动阶段的耗时。stdlib import只包含本文件顶部的标准库导入，
+# launcher等模块的导入单独列出；解释器启动和逐个模块的导入耗时请配合 python -X importtime 查看
+if '--profile-startup' in sys.argv[1:]:
+    profiler.enable()
+profiler.record('stdlib import', time.perf_counter() - _import_start)
 
 # 确保日志目录存在
 log_dir = 'FCL/logs'
@@ -19,12 +28,20 @@ logging.basicConfig(
 )
 
 async def main():
-    action = input("请选择操作（1：下载，2：启动）：")
+    action = input("请选择操作（1：下载，2：启动，3：多实例启动）：")
     if action == '1':
         version = input("请输入Minecraft版本：")
+        with profiler.phase('import downloader'):
+            import downloader
         await downloader.download(version)
     elif action == '2':
+        with profiler.phase('import launcher'):
+            import launcher
         await launcher.launch_game()
+    elif action == '3':
+        with profiler.phase('import supervisor'):
+            import supervisor
+        await supervisor.launch_instances()
     else:
         print("无效的选择")
 
@@ -32,6 +49,7 @@ if __name__ == "__main__":
     while True:
         try:
             asyncio.run(main())
+            profiler.report()
         except KeyboardInterrupt:
             print("\n程序已退出")
             break
\ No newline at end of file
@@ -0,0 +1,52 @@
+import time
+import contextvars
+from contextlib import contextmanager
+
+# 由 --profile-startup 开启，关闭时phase()不做任何计时
+enabled = False
+# 名称 -> [耗时, 是否嵌套在其他阶段内]
+_records = {}
+# 当前所在阶段的嵌套深度，使用contextvars使并发的任务互不影响
+_depth = contextvars.ContextVar('profiler_depth', default=0)
+
+def enable():
+    global enabled
+    enabled = True
+
+def record(name, seconds, nested=None):
+    if enabled:
+        if nested is None:
+            nested = _depth.get() > 0
+        entry = _records.setdefault(name, [0.0, nested])
+        entry[0] += seconds
+
+@contextmanager
+def phase(name):
+    if not enabled:
+        yield
+        return
+    nested = _depth.get() > 0
+    # 进入时先占位，使报告按阶段开始的顺序排列，外层阶段排在其嵌套阶段之前
+    _records.setdefault(name, [0.0, nested])
+    token = _depth.set(_depth.get() + 1)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _depth.reset(token)
+        record(name, time.perf_counter() - start, nested)
+
+def reset():
+    _records.clear()
+
+def report(title=None):
+    if not enabled or not _records:
+        return
+    print(f"启动耗时统计（{title}）：" if title else "启动耗时统计：")
+    for name, (seconds, nested) in _records.items():
+        # 嵌套阶段的耗时已包含在外层阶段中，缩进显示且不计入total
+        label = f"  {name}" if nested else name
+        print(f"  {label:<20}{seconds * 1000:>10.1f} ms")
+    total = sum(seconds for seconds, nested in _records.values() if not nested)
+    print(f"  {'total':<20}{total * 1000:>10.1f} ms")
+    _records.clear()
@@ -0,0 +1,386 @@
+import asyncio
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import profiler
+from java_finder import find_java_version
+from launcher import build_launch_command, format_log4j_event, get_java_major_version, load_version_json, select_account
+from jvm_options import finalize_cds_archive, get_max_instance_count
+
+# 重启策略：no 不重启，on-failure 非正常退出时重启，always 总是重启
+RESTART_POLICIES = ('no', 'on-failure', 'always')
+# 游戏输出单行的最大长度，默认的64KB放不下部分模组输出的超长日志行
+LOG_STREAM_LIMIT = 1024 * 1024
+
+class GameInstance:
+    def __init__(self, name, game_dir, version, username, uuid, access_token, java_path, instance_dir=None, restart_policy='no', max_restarts=3):
+        if restart_policy not in RESTART_POLICIES:
+            raise ValueError(f"Unsupported restart policy: {restart_policy}")
+        self.name = name
+        self.game_dir = game_dir
+        self.version = version
+        self.username = username
+        self.uuid = uuid
+        self.access_token = access_token
+        # Java路径在启动前一次性解析，启动和重启时都不再探测，避免阻塞事件循环或与命令输入争抢stdin
+        self.java_path = java_path
+        # 每个实例默认使用独立的游戏目录，避免存档和配置互相覆盖
+        self.instance_dir = instance_dir or os.path.join(game_dir, 'instances', name)
+        self.restart_policy = restart_policy
+        self.max_restarts = max_restarts
+        self.log_path = os.path.join(self.instance_dir, 'logs', 'fcl-latest.log')
+
+        self.status = 'pending'
+        self.process = None
+        self.returncode = None
+        self.restarts = 0
+        self.started_at = None
+        self.stop_requested = False
+        self.task = None
+        self.cds_dump_path = None
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    def should_restart(self):
+        if self.stop_requested or self.restarts >= self.max_restarts:
+            return False
+        if self.restart_policy == 'always':
+            return True
+        return self.restart_policy == 'on-failure' and self.returncode != 0
+
+async def get_process_memory(pid):
+    """返回进程的常驻内存（字节），获取失败时返回None"""
+    if pid is None:
+        return None
+    try:
+        if sys.platform == 'win32':
+            proc = await asyncio.create_subprocess_exec(
+                'tasklist', '/FI', f'PID eq {pid}', '/FO', 'CSV', '/NH',
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+            stdout, _ = await proc.communicate()
+            # 输出形如 "java.exe","1234","Console","1","1,234,567 K"
+            fields = re.findall(r'"([^"]*)"', stdout.decode(errors='ignore'))
+            if len(fields) >= 5:
+                return int(re.sub(r'\D', '', fields[4])) * 1024
+        else:
+            with open(f'/proc/{pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+    except (OSError, ValueError) as e:
+        logging.debug(f"Failed to read memory of process {pid}: {e}")
+    return None
+
+class Supervisor:
+    def __init__(self, stagger=10.0, echo_logs=True):
+        # stagger为相邻两个JVM启动之间的最小间隔（秒），避免多个客户端同时加载造成CPU和磁盘争抢
+        self.stagger = stagger
+        self.echo_logs = echo_logs
+        self.instances = {}
+        self._start_lock = asyncio.Lock()
+        self._last_start = None
+
+    def add(self, instance):
+        if instance.name in self.instances:
+            raise ValueError(f"Instance {instance.name} already exists")
+        self.instances[instance.name] = instance
+        return instance
+
+    async def _wait_for_start_slot(self):
+        # 调用方需持有_start_lock
+        if self._last_start is not None:
+            delay = self._last_start + self.stagger - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self._last_start = time.monotonic()
+
+    async def _spawn(self, instance):
+        async with self._start_lock:
+            await self._wait_for_start_slot()
+            instance.status = 'starting'
+            command, instance.cds_dump_path = await build_launch_command(
+                game_dir=instance.game_dir,
+                version=instance.version,
+                auth_player_name=instance.username,
+                uuid=instance.uuid,
+                access_token=instance.access_token,
+                instance_dir=instance.instance_dir,
+                instance_count=len(self.instances),
+                java_path=instance.java_path
+            )
+            with profiler.phase('spawn'):
+                instance.process = await asyncio.create_subprocess_exec(
+                    *command,
+                    cwd=instance.instance_dir,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    limit=LOG_STREAM_LIMIT
+                )
+            # 每个实例只报告首次启动的开销，重启的计时直接丢弃，不混入启动统计
+            if instance.restarts:
+                profiler.reset()
+            else:
+                profiler.report(instance.name)
+        instance.status = 'running'
+        instance.returncode = None
+        instance.started_at = time.time()
+        logging.info(f"[{instance.name}] started with PID {instance.pid}")
+
+    async def _pump_logs(self, instance):
+        printed_logs = set()
+        os.makedirs(os.path.dirname(instance.log_path), exist_ok=True)
+        # 重启时追加写入，保留崩溃那次运行的输出；每次调用start()时才清空
+        mode = 'a' if instance.restarts else 'w'
+        with open(instance.log_path, mode, encoding='utf-8') as log_file:
+            log_file.write(f"===== {time.strftime('%Y-%m-%d %H:%M:%S')} 启动 PID={instance.pid} 重启次数={instance.restarts} =====\n")
+            while True:
+                try:
+                    line = await instance.process.stdout.readline()
+                except ValueError:
+                    # 单行超过LOG_STREAM_LIMIT，超出部分已被丢弃，后续读取不受影响
+                    log_file.write(f"[FCL] 日志行超过{LOG_STREAM_LIMIT}字节，已截断\n")
+                    continue
+                if not line:
+                    break
+                line = line.decode('latin-1').replace('\r\n', '\n').replace('\r', '\n')
+                log_file.write(line)
+                formatted_line = format_log4j_event(line, printed_logs)
+                if formatted_line and self.echo_logs:
+                    print(f"[{instance.name}] {formatted_line}", end='')
+
+    async def _run(self, instance):
+        try:
+            await self._supervise(instance)
+        finally:
+            # 任何路径退出（包括取消和未预期的异常）都要留下终态，避免一直显示为running
+            if instance.status not in ('exited', 'failed', 'stopped'):
+                instance.status = 'stopped' if instance.stop_requested else 'failed'
+
+    async def _supervise(self, instance):
+        while True:
+            try:
+                await self._spawn(instance)
+            except Exception as e:
+                logging.error(f"[{instance.name}] failed to start: {e}")
+                finalize_cds_archive(instance.cds_dump_path)
+                instance.cds_dump_path = None
+                instance.status = 'failed'
+                return
+            try:
+                await self._pump_logs(instance)
+            except Exception as e:
+                # 管道或日志文件读写失败时输出不再被消费，游戏会被阻塞，直接结束进程并按重启策略处理
+                logging.error(f"[{instance.name}] log stream failed: {e}")
+                try:
+                    instance.process.kill()
+                except ProcessLookupError:
+                    pass
+            finally:
+                instance.returncode = await instance.process.wait()
+                finalize_cds_archive(instance.cds_dump_path)
+                instance.cds_dump_path = None
+            logging.info(f"[{instance.name}] exited with code {instance.returncode}")
+
+            if not instance.should_restart():
+                if instance.stop_requested:
+                    instance.status = 'stopped'
+                else:
+                    instance.status = 'exited' if instance.returncode == 0 else 'failed'
+                return
+            instance.restarts += 1
+            instance.status = 'restarting'
+            logging.info(f"[{instance.name}] restarting ({instance.restarts}/{instance.max_restarts})")
+
+    def start(self, name):
+        instance = self.instances[name]
+        if instance.task and not instance.task.done():
+            return instance.task
+        instance.stop_requested = False
+        instance.restarts = 0
+        instance.task = asyncio.create_task(self._run(instance))
+        return instance.task
+
+    def start_all(self):
+        return [self.start(name) for name in self.instances]
+
+    async def stop(self, name, timeout=15.0):
+        instance = self.instances[name]
+        instance.stop_requested = True
+        if instance.process and instance.process.returncode is None:
+            instance.process.terminate()
+            try:
+                await asyncio.wait_for(instance.process.wait(), timeout)
+            except asyncio.TimeoutError:
+                instance.process.kill()
+        elif instance.task and not instance.task.done():
+            # 仍在排队等待启动，直接取消
+            instance.task.cancel()
+            instance.status = 'stopped'
+        if instance.task:
+            try:
+                await instance.task
+            except asyncio.CancelledError:
+                pass
+
+    async def stop_all(self):
+        await asyncio.gather(*(self.stop(name) for name in self.instances))
+
+    async def wait(self):
+        # 等待期间可能有实例被重新启动，直到没有未结束的任务为止
+        while tasks := [instance.task for instance in self.instances.values() if instance.task and not instance.task.done()]:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def memory(self, name):
+        return await get_process_memory(self.instances[name].pid)
+
+    async def status(self):
+        result = []
+        for instance in self.instances.values():
+            running = instance.status == 'running'
+            result.append({
+                'name': instance.name,
+                'status': instance.status,
+                'pid': instance.pid if running else None,
+                'returncode': instance.returncode,
+                'restarts': instance.restarts,
+                'uptime': time.time() - instance.started_at if running else None,
+                'memory': await self.memory(instance.name) if running else None,
+                'log_path': instance.log_path
+            })
+        return result
+
+def read_line():
+    """在守护线程中读取一行输入，退出时不会像asyncio.to_thread那样等待该线程结束"""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def set_result(line, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(line)
+
+    def reader():
+        line, error = None, None
+        try:
+            line = input()
+        except Exception as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(set_result, line, error)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    threading.Thread(target=reader, daemon=True).start()
+    return future
+
+def print_status(rows):
+    for row in rows:
+        memory = f"{row['memory'] / 1024 / 1024:.0f}MB" if row['memory'] else "-"
+        uptime = f"{row['uptime']:.0f}s" if row['uptime'] else "-"
+        print(f"{row['name']}: {row['status']} PID={row['pid'] or '-'} 内存={memory} 运行时间={uptime} 重启次数={row['restarts']} 退出码={row['returncode']}")
+
+async def launch_instances():
+    if not os.path.exists('.minecraft/versions'):
+        print("没有找到Minecraft版本，请先下载")
+        return
+
+    game_dir = os.path.join(os.getcwd(), '.minecraft')
+    versions = os.listdir(os.path.join(game_dir, 'versions'))
+    version = input("请输入Minecraft版本 " + str(versions) + " ：")
+    try:
+        count = int(input("请输入启动实例数量："))
+    except ValueError:
+        count = 0
+    if count < 1:
+        print("无效的实例数量")
+        return
+    max_count = get_max_instance_count()
+    if max_count is not None and count > max_count:
+        confirm = input(f"本机内存最多支持同时运行{max_count}个实例，{count}个实例的堆内存总和将超过物理内存，是否继续？（y/N）：")
+        if confirm.lower() != 'y':
+            return
+    restart_policy = input("请选择重启策略（no/on-failure/always，默认no）：") or 'no'
+    if restart_policy not in RESTART_POLICIES:
+        print("无效的重启策略")
+        return
+    try:
+        stagger = float(input("请输入相邻实例的启动间隔秒数（默认10）：") or 10)
+    except ValueError:
+        stagger = -1
+    if stagger < 0:
+        print("无效的启动间隔")
+        return
+
+    with profiler.phase('metadata'):
+        version_json = await load_version_json(game_dir, version)
+    java_path = find_java_version(get_java_major_version(version_json))
+    print(f"Java路径: {java_path}")
+
+    supervisor = Supervisor(stagger=stagger)
+    for i in range(1, count + 1):
+        print(f"配置实例 {i}：")
+        account = await select_account()
+        if account is None:
+            return
+        username, uuid, access_token = account
+        supervisor.add(GameInstance(
+            name=f"{i}-{username}",
+            game_dir=game_dir,
+            version=version,
+            username=username,
+            uuid=uuid,
+            access_token=access_token,
+            java_path=java_path,
+            restart_policy=restart_policy
+        ))
+
+    # 版本信息、Java和账户是所有实例共用的准备工作，单独报告
+    profiler.report("多实例准备")
+    supervisor.start_all()
+    print("实例已开始启动，输入命令管理实例（s：查看状态，k 名称：停止实例，r 名称：启动实例，q：停止全部并退出）")
+    waiter = asyncio.ensure_future(supervisor.wait())
+    while True:
+        line = read_line()
+        await asyncio.wait({line, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        if not line.done():
+            # 所有实例都已自行退出，读取掉这一行输入，避免被主菜单误读
+            print("所有实例已结束，按回车键返回")
+            try:
+                await line
+            except EOFError:
+                pass
+            break
+        try:
+            command = line.result().strip().split(maxsplit=1)
+        except EOFError:
+            await supervisor.stop_all()
+            break
+        if not command:
+            continue
+        if command[0] == 's':
+            print_status(await supervisor.status())
+        elif command[0] in ('k', 'r') and len(command) == 2 and command[1] in supervisor.instances:
+            if command[0] == 'k':
+                await supervisor.stop(command[1])
+            else:
+                supervisor.start(command[1])
+        elif command[0] == 'q':
+            await supervisor.stop_all()
+        else:
+            print("无效的命令")
+        if waiter.done():
+            break
+    await waiter
+    print("所有实例已结束")
+    print_status(await supervisor.status())